@@ -12,6 +12,8 @@ from baserule import BaseRule, BaseRuleConfig, RuleStatus, Status
 from pydantic import ValidationError
 from ruamel.yaml import YAML
 
+from maps_workflow.rules.similarity import DEFAULT_INDEX_PATH, INDEX_PATH_ENV, MapIndex
+
 STATUS_SYMBOL = {
     Status.COMPLETED: "✅",
     Status.FAILED: "❌",
@@ -191,6 +193,13 @@ def execute_rules(raw_file, map_data, config) -> tuple[bool, str]:
     return True, result_string
 
 
+def set_index_path(config, index_path: str):
+    """Point the copy detection rules at the map index given on the command line."""
+    for rule_config in config["rules"]:
+        if rule_config.get("module") == "rules.similarity":
+            rule_config["params"] = {**(rule_config.get("params") or {}), "index_path": index_path}
+
+
 def generate_rules_file():
     """Generate a list of all available rules with their descriptions."""
     config = load_all_rules("map_rules/", exclude=[])
@@ -228,6 +237,7 @@ if __name__ == "__main__":
     parser.add_argument("--ci", action="store_true")
     parser.add_argument("--action", default=os.environ.get("ACTION", "check"))
     parser.add_argument("--mapscsv")
+    parser.add_argument("--index", default=os.environ.get(INDEX_PATH_ENV, DEFAULT_INDEX_PATH))
     args = parser.parse_args()
 
     output = []
@@ -241,6 +251,7 @@ if __name__ == "__main__":
                 excluded = args.skip.split(",") if "," in args.skip else [args.skip]
 
             config = load_all_rules("map_rules/", exclude=excluded)
+            set_index_path(config, args.index)
             tw_map = twmap.Map(args.map)
             result = execute_rules(args.map, tw_map, config)
 
@@ -254,6 +265,14 @@ if __name__ == "__main__":
                 output.append("❌ Workflow failed due to required rule failure.")
                 exit_code = 1
 
+        elif args.action == "index_map":
+            index = MapIndex.load(args.index) if os.path.isfile(args.index) else MapIndex()
+            for map_path in args.map.split(","):
+                if not index.add(Path(map_path).stem, twmap.Map(map_path)):
+                    output.append(f"⚠️ Map `{Path(map_path).name}` has no tile blocks to index.")
+            index.save(args.index)
+            output.append(f"✅ Indexed {len(index)} maps in `{args.index}`.")
+
         elif args.action == "generate_votes":
             output.append("Generating votes... please wait")
         elif args.action == "check_if_vote_exists":
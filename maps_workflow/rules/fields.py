@@ -0,0 +1,251 @@
+import math
+import re
+from functools import cached_property, lru_cache
+from typing import Callable, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, model_validator
+
+from maps_workflow.baserule import BaseRule
+from maps_workflow.exceptions import RuleError, RuleViolationError
+
+INFO_FIELDS = ("author", "version", "credits", "license")
+
+
+class Constraint(BaseModel):
+    field: str
+    type: Literal["list", "regex", "range", "required", "forbidden"]
+    source: Literal["setting", "info"] = "setting"
+    name: Optional[str] = None
+    regex: Optional[str] = None
+    values: Optional[List[str]] = []
+    separator: str = ","
+    min: Optional[float] = None
+    max: Optional[float] = None
+    required: bool = False
+
+    @model_validator(mode="after")
+    def check_operands(self) -> "Constraint":
+        if self.type == "list" and not self.values:
+            raise ValueError(f'"{self.field}": type list requires "values"')
+        if self.type == "regex" and self.regex is None:
+            raise ValueError(f'"{self.field}": type regex requires "regex"')
+        if self.type == "range" and self.min is None and self.max is None:
+            raise ValueError(f'"{self.field}": type range requires "min" and/or "max"')
+        return self
+
+    def label(self) -> str:
+        return self.name or f"{self.source}.{self.field} ({self.type})"
+
+    def describe(self) -> str:
+        subject = f"{'Setting' if self.source == 'setting' else 'Info'} '{self.field}'"
+        if self.type == "list":
+            return f"{subject} only allows {', '.join(self.values)}"
+        if self.type == "regex":
+            return f"{subject} has to match '{self.regex}'"
+        if self.type == "range":
+            lower = f"{self.min:g}" if self.min is not None else "-inf"
+            upper = f"{self.max:g}" if self.max is not None else "inf"
+            return f"{subject} has to be within [{lower}, {upper}]"
+        if self.type == "forbidden":
+            return f"{subject} is not allowed"
+        return f"{subject} is required"
+
+
+class ConstraintResult(BaseModel):
+    constraint: Constraint
+    value: Optional[str]
+    violation: Optional[RuleViolationError] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def passed(self) -> bool:
+        return self.violation is None
+
+
+# Console arguments: quoted strings with \" and \\ escapes (running to the end of the line if unterminated) or words
+_ARGUMENT = re.compile(r'"((?:[^"\\]|\\.)*)"?|(\S+)')
+_ESCAPE = re.compile(r'\\(["\\])')
+
+
+def tokenize(arguments: str) -> List[str]:
+    """Split console arguments like the console does: quotes group words, backslashes only escape inside quotes."""
+    return [
+        word if word is not None else _ESCAPE.sub(r"\1", quoted)
+        for quoted, word in (match.groups() for match in _ARGUMENT.finditer(arguments))
+    ]
+
+
+def parse_settings(commands: List[str]) -> Dict[str, str]:
+    """Parse map settings commands into a command -> argument index, later commands win.
+
+    Commands with several arguments, like `tune gravity 0.5`, are also indexed by command and first argument
+    (`tune gravity` -> `0.5`), so every tune stays available.
+    """
+    settings = {}
+    for command in commands:
+        parts = command.strip().split(None, 1)
+        if not parts:
+            continue
+        arguments = tokenize(parts[1]) if len(parts) > 1 else []
+        settings[parts[0]] = " ".join(arguments)
+        if len(arguments) > 1:
+            settings[f"{parts[0]} {arguments[0]}"] = " ".join(arguments[1:])
+    return settings
+
+
+class FieldIndex:
+    """Settings and info fields of a map, read once."""
+
+    def __init__(self, map_file) -> None:
+        info = map_file.info
+        self.fields = {
+            # twmap returns "" for unset info fields
+            "info": {field: getattr(info, field) for field in INFO_FIELDS if getattr(info, field, "")},
+            "setting": parse_settings(info.settings),
+        }
+
+    def lookup(self, source: str, field: str) -> Optional[str]:
+        return self.fields.get(source, {}).get(field)
+
+
+@lru_cache(maxsize=None)
+def compile_pattern(regex: str) -> re.Pattern:
+    try:
+        return re.compile(regex)
+    except re.error as error:
+        raise RuleError(message=f'Invalid regex "{regex}": {error}') from error
+
+
+def _check_list(constraint: Constraint, allowed: frozenset, value: str) -> RuleViolationError | None:
+    for val in value.split(constraint.separator):
+        if val.strip() not in allowed:
+            return RuleViolationError(
+                message=f'"{val}" in "{constraint.field}" is not explicitly set. '
+                f'Allowed values: "{", ".join(constraint.values)}".',
+                errors=[val, "in", constraint.values],
+            )
+    return None
+
+
+def _check_regex(constraint: Constraint, pattern: re.Pattern, value: str) -> RuleViolationError | None:
+    if pattern.match(value):
+        return None
+    return RuleViolationError(
+        message=f'"{value}" does not match "{constraint.regex}".',
+        errors=[value, "!=", constraint.regex],
+    )
+
+
+def _check_range(constraint: Constraint, _, value: str) -> RuleViolationError | None:
+    try:
+        number = float(value)
+    except ValueError:
+        number = math.nan
+
+    if not math.isfinite(number):
+        return RuleViolationError(
+            message=f'"{value}" in "{constraint.field}" is not a number.',
+            errors=[value, "is", "number"],
+        )
+
+    if constraint.min is not None and number < constraint.min:
+        return RuleViolationError(
+            message=f'"{constraint.field}" is {value}, but has to be at least {constraint.min:g}.',
+            errors=[number, ">=", constraint.min],
+        )
+    if constraint.max is not None and number > constraint.max:
+        return RuleViolationError(
+            message=f'"{constraint.field}" is {value}, but has to be at most {constraint.max:g}.',
+            errors=[number, "<=", constraint.max],
+        )
+    return None
+
+
+def _check_required(_, __, ___: str) -> RuleViolationError | None:
+    return None
+
+
+def _check_forbidden(constraint: Constraint, _, value: str) -> RuleViolationError | None:
+    return RuleViolationError(
+        message=f'"{constraint.field}" is set to "{value}", but is not allowed.',
+        errors=[constraint.field, "not in", constraint.source],
+    )
+
+
+class CompiledConstraint:
+    constraint: Constraint
+    operand: object
+    check: Callable
+    required: bool
+
+    def __init__(self, constraint: Constraint) -> None:
+        self.constraint = constraint
+        self.operand = None
+        self.check = CHECKS[constraint.type]
+        self.required = constraint.required or constraint.type == "required"
+
+        if constraint.type == "list":
+            self.operand = frozenset(constraint.values)
+        elif constraint.type == "regex":
+            self.operand = compile_pattern(constraint.regex)
+
+    def evaluate(self, index: FieldIndex) -> ConstraintResult:
+        value = index.lookup(self.constraint.source, self.constraint.field)
+        if value is None:
+            violation = None
+            if self.required:
+                violation = RuleViolationError(
+                    message=f'"{self.constraint.field}" does not exist, but is required.',
+                    errors=[self.constraint.field, "in", self.constraint.source],
+                )
+            return ConstraintResult(constraint=self.constraint, value=None, violation=violation)
+
+        return ConstraintResult(
+            constraint=self.constraint,
+            value=value,
+            violation=self.check(self.constraint, self.operand, value),
+        )
+
+
+CHECKS = {
+    "list": _check_list,
+    "regex": _check_regex,
+    "range": _check_range,
+    "required": _check_required,
+    "forbidden": _check_forbidden,
+}
+
+
+def compile_plan(constraints: List[Constraint]) -> List[CompiledConstraint]:
+    return [CompiledConstraint(constraint) for constraint in constraints]
+
+
+def evaluate_plan(plan: List[CompiledConstraint], map_file) -> List[ConstraintResult]:
+    index = FieldIndex(map_file)
+    return [compiled.evaluate(index) for compiled in plan]
+
+
+class ValidParams(BaseModel):
+    constraints: List[Constraint]
+
+
+class Valid(BaseRule):
+    params: ValidParams
+
+    def get_params_model(self):
+        return ValidParams
+
+    @cached_property
+    def plan(self) -> List[CompiledConstraint]:
+        return compile_plan(self.params.constraints)
+
+    def results(self) -> List[ConstraintResult]:
+        return evaluate_plan(self.plan, self.map_file)
+
+    def evaluate(self):
+        return [result.violation for result in self.results() if not result.passed]
+
+    def explain(self):
+        return "; ".join(constraint.describe() for constraint in self.params.constraints)
@@ -1,9 +1,10 @@
+from functools import cached_property
 from typing import List, Optional
 
 from pydantic import BaseModel
 
 from maps_workflow.baserule import BaseRule
-from maps_workflow.exceptions import RuleViolationError
+from maps_workflow.rules.fields import CompiledConstraint, Constraint, FieldIndex
 
 
 class ValidParams(BaseModel):
@@ -11,6 +12,7 @@ class ValidParams(BaseModel):
     type: str
     regex: Optional[str] = None
     values: Optional[List[str]] = []
+    required: bool = False
 
 
 class Valid(BaseRule):
@@ -19,35 +21,13 @@ class Valid(BaseRule):
     def get_params_model(self):
         return ValidParams
 
-    def __handle_noop(self, value):
-        return
-
-    def __handle_regex(self, value):
-        print(value)
-
-    def __handle_list(self, value: str):
-        values = value.split(",")
-        for val in values:
-            if val not in self.params.values:
-                return RuleViolationError(message=f"{val} is not in {self.params.values}", errors=[])
-        return None
+    @cached_property
+    def constraint(self) -> CompiledConstraint:
+        return CompiledConstraint(Constraint(source="setting", **self.params.model_dump()))
 
     def evaluate(self):
-        violations = []
-
-        if hasattr(self.map_file.info.settings, self.params.field):
-            value = getattr(self.map_file.info.settings, self.params.field)
-            value_type = {
-                "list": self.__handle_list,
-                "regex": self.__handle_regex,
-            }
-            violations.append(value_type.get(self.params.type, self.__handle_noop)(value))
-
-        return violations
+        result = self.constraint.evaluate(FieldIndex(self.map_file))
+        return [] if result.passed else [result.violation]
 
     def explain(self):
-        if hasattr(self.map_file.info.settings, self.params.field):
-            value = getattr(self.map_file.info.settings, self.params.field)
-            return f"Setting '{value}' in '{self.params.field}' is not a valid option"
-        else:
-            return f"Setting '{self.params.field}' does not exist, but is required"
+        return self.constraint.constraint.describe()
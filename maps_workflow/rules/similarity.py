@@ -0,0 +1,218 @@
+import os
+from functools import cached_property
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, PositiveInt
+
+from maps_workflow.baserule import BaseRule
+from maps_workflow.exceptions import RuleViolationError
+
+DEFAULT_INDEX_PATH = "./data/map_index.npz"
+# Fallback for rules without an `index_path` param and default of `main.py --index`
+INDEX_PATH_ENV = "MAP_INDEX"
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """Finalize 64 bit hashes (splitmix64), so linear combinations of tile ids spread over all bits."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def index_path() -> str:
+    return os.environ.get(INDEX_PATH_ENV, DEFAULT_INDEX_PATH)
+
+
+class Match(BaseModel):
+    name: str
+    similarity: float
+    overlap: float
+
+
+class MapIndex:
+    """Matrix of MinHash signatures of the game layer of accepted maps, compared in one pass per query."""
+
+    names: List[str]
+    signatures: np.ndarray
+    sizes: np.ndarray
+
+    def __init__(self, shingle_size: int = 8, num_perm: int = 128, seed: int = 1) -> None:
+        self.shingle_size = shingle_size
+        self.num_perm = num_perm
+        self.seed = seed
+        self.names = []
+        self.signatures = np.empty((0, num_perm), dtype=np.uint64)
+        self.sizes = np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @cached_property
+    def __coefficients(self) -> Tuple[np.ndarray, np.ndarray]:
+        rng = np.random.default_rng(self.seed)
+        limit = np.iinfo(np.uint64).max
+        position = rng.integers(1, limit, size=(self.shingle_size, self.shingle_size), dtype=np.uint64, endpoint=True)
+        seeds = rng.integers(0, limit, size=self.num_perm, dtype=np.uint64, endpoint=True)
+        return position, seeds
+
+    def shingles(self, map_file) -> np.ndarray:
+        """Distinct hashes of all `shingle_size` squared game layer blocks holding more than one tile id."""
+        ids = map_file.game_layer().tiles[:, :, 0]
+        k = self.shingle_size
+        h, w = ids.shape[0] - k + 1, ids.shape[1] - k + 1
+        if h <= 0 or w <= 0:
+            return np.empty(0, dtype=np.uint64)
+
+        position, _ = self.__coefficients
+        hashes = np.zeros((h, w), dtype=np.uint64)
+        lowest = np.full((h, w), 255, dtype=np.uint8)
+        highest = np.zeros((h, w), dtype=np.uint8)
+        for dy in range(k):
+            for dx in range(k):
+                block = ids[dy : dy + h, dx : dx + w]
+                hashes += block.astype(np.uint64) * position[dy, dx]
+                np.minimum(lowest, block, out=lowest)
+                np.maximum(highest, block, out=highest)
+
+        return np.unique(_mix(hashes[lowest != highest]))
+
+    def signature(self, shingles: np.ndarray, chunk_size: int = 4096) -> np.ndarray:
+        _, seeds = self.__coefficients
+        signature = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, shingles.size, chunk_size):
+            chunk = shingles[start : start + chunk_size, None]
+            np.minimum(signature, _mix(chunk ^ seeds).min(axis=0), out=signature)
+        return signature
+
+    def fingerprint(self, map_file) -> Tuple[np.ndarray, int]:
+        shingles = self.shingles(map_file)
+        return self.signature(shingles), shingles.size
+
+    def add(self, name: str, map_file) -> bool:
+        """Add or replace `name` in the index, maps without any informative block are skipped."""
+        signature, size = self.fingerprint(map_file)
+        if size == 0:
+            return False
+
+        keep = np.array([existing != name for existing in self.names], dtype=bool)
+        self.names = [existing for existing in self.names if existing != name] + [name]
+        self.signatures = np.vstack([self.signatures[keep], signature])
+        self.sizes = np.append(self.sizes[keep], size)
+        return True
+
+    def query(
+        self,
+        signature: np.ndarray,
+        size: int,
+        threshold: float,
+        limit: int,
+        min_matches: int = 8,
+        exclude: Optional[str] = None,
+    ) -> List[Match]:
+        """Maps whose estimated overlap with `signature` is `threshold` or more.
+
+        The overlap is the share of the smaller map's blocks found in the other map, so a small map reused inside a
+        bigger one is found even though their Jaccard similarity is diluted by the size difference. It is derived
+        from the Jaccard estimate, whose error is scaled by the size ratio, so maps with less than `min_matches`
+        matching signature slots are not reported at all.
+        """
+        if size == 0 or not self.names:
+            return []
+
+        matching = (self.signatures == signature).sum(axis=1)
+        candidates = np.flatnonzero(matching >= min_matches)
+        sizes = self.sizes[candidates]
+        similarity = matching[candidates] / self.num_perm
+        # |A n B| = J / (1 + J) * (|A| + |B|)
+        overlap = np.minimum(similarity / (1 + similarity) * (size + sizes) / np.minimum(size, sizes), 1.0)
+
+        matches = []
+        for i in np.argsort(-overlap, kind="stable"):
+            name = self.names[candidates[i]]
+            if overlap[i] < threshold or name == exclude:
+                continue
+            matches.append(Match(name=name, similarity=float(similarity[i]), overlap=float(overlap[i])))
+            if len(matches) >= limit:
+                break
+        return matches
+
+    @classmethod
+    def load(cls, path: str) -> "MapIndex":
+        with np.load(path, allow_pickle=False) as data:
+            index = cls(
+                shingle_size=int(data["shingle_size"]),
+                num_perm=int(data["num_perm"]),
+                seed=int(data["seed"]),
+            )
+            index.names = data["names"].tolist()
+            index.signatures = data["signatures"]
+            index.sizes = data["sizes"]
+        return index
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as file:
+            np.savez(
+                file,
+                shingle_size=self.shingle_size,
+                num_perm=self.num_perm,
+                seed=self.seed,
+                names=np.array(self.names, dtype=str),
+                signatures=self.signatures,
+                sizes=self.sizes,
+            )
+
+
+class UniqueParams(BaseModel):
+    index_path: Optional[str] = None
+    threshold: float = 0.3
+    max_results: PositiveInt = 5
+    min_matches: PositiveInt = 8
+
+
+class Unique(BaseRule):
+    params: UniqueParams
+
+    def get_params_model(self):
+        return UniqueParams
+
+    def evaluate(self):
+        violations = []
+        path = self.params.index_path or index_path()
+        if not os.path.isfile(path):
+            violations.append(
+                RuleViolationError(
+                    message=f"Map index '{path}' not found, the map was not compared to accepted maps.",
+                    errors=[path, "is", "file"],
+                )
+            )
+            return violations
+
+        index = MapIndex.load(path)
+        signature, size = index.fingerprint(self.map_file)
+        matches = index.query(
+            signature,
+            size,
+            self.params.threshold,
+            self.params.max_results,
+            min_matches=self.params.min_matches,
+            exclude=Path(self.raw_file).stem,
+        )
+        for match in matches:
+            violations.append(
+                RuleViolationError(
+                    message=f'Map shares about {match.overlap:.0%} of its tile blocks with "{match.name}" '
+                    f"(relative to the smaller map, Jaccard similarity {match.similarity:.0%}).",
+                    errors=[match.name, ">=", self.params.threshold],
+                )
+            )
+        return violations
+
+    def explain(self):
+        return (
+            f"Check that the map shares less than {self.params.threshold:.0%} of its tile blocks with any accepted map"
+        )
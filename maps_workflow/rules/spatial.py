@@ -0,0 +1,288 @@
+from functools import cached_property
+from typing import Callable, Dict, List, Literal, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, PositiveInt, model_validator
+
+from maps_workflow.baserule import BaseRule
+from maps_workflow.exceptions import RuleError, RuleViolationError
+
+# Physics layer -> (getter on the map, channel holding the tile id, channel holding the number)
+PHYSICS_LAYERS = {
+    "game": ("game_layer", 0, None),
+    "front": ("front_layer", 0, None),
+    "tele": ("tele_layer", 1, 0),
+    "switch": ("switch_layer", 1, 0),
+    "tune": ("tune_layer", 1, 0),
+}
+
+
+class SpatialConstraint(BaseModel):
+    type: Literal["contiguous", "not_adjacent", "paired", "inside_border"]
+    tiles: List[int]
+    humanized: str
+    name: Optional[str] = None
+    layers: List[Literal["game", "front", "tele", "switch", "tune"]] = ["game", "front"]
+    connectivity: Literal[4, 8] = 4
+    max_regions: PositiveInt = 1
+    neighbour_tiles: Optional[List[int]] = []
+    neighbour_humanized: Optional[str] = None
+    offset: Tuple[int, int] = (1, 0)
+    partner_tiles: Optional[List[int]] = []
+    margin: PositiveInt = 1
+    max_reported: PositiveInt = 10
+
+    @model_validator(mode="after")
+    def check_operands(self) -> "SpatialConstraint":
+        if self.type == "not_adjacent" and not self.neighbour_tiles:
+            raise ValueError(f'"{self.humanized}": type not_adjacent requires "neighbour_tiles"')
+        if self.type == "paired":
+            if not self.partner_tiles:
+                raise ValueError(f'"{self.humanized}": type paired requires "partner_tiles"')
+            if not any(PHYSICS_LAYERS[layer][2] is not None for layer in self.layers):
+                raise ValueError(f'"{self.humanized}": type paired requires a numbered layer (tele, switch or tune)')
+        return self
+
+    def label(self) -> str:
+        return self.name or f"{self.humanized} ({self.type})"
+
+
+class Region(BaseModel):
+    size: int
+    top: int
+    left: int
+    bottom: int
+    right: int
+
+    def describe(self) -> str:
+        return f"{self.size} tile(s) from position ({self.top}, {self.left}) to ({self.bottom}, {self.right})"
+
+
+class TileLayers:
+    """Tile id and number arrays of the physics layers of a map, read once."""
+
+    def __init__(self, map_file) -> None:
+        self.ids: Dict[str, np.ndarray] = {}
+        self.numbers: Dict[str, np.ndarray] = {}
+        self.__masks: Dict[tuple, np.ndarray] = {}
+
+        for name, (getter, id_channel, number_channel) in PHYSICS_LAYERS.items():
+            layer = getattr(map_file, getter)()
+            if layer is None:
+                continue
+            tiles = layer.tiles
+            self.ids[name] = tiles[:, :, id_channel]
+            if number_channel is not None:
+                self.numbers[name] = tiles[:, :, number_channel]
+
+        if "game" not in self.ids:
+            raise RuleError(message="Map has no game layer")
+        self.shape = self.ids["game"].shape
+
+    def mask(self, tiles: List[int], layers: List[str]) -> np.ndarray:
+        """Boolean mask of the cells holding one of `tiles` in any of `layers`."""
+        key = (tuple(sorted(tiles)), tuple(sorted(layers)))
+        if key not in self.__masks:
+            mask = np.zeros(self.shape, dtype=bool)
+            for name in layers:
+                if name in self.ids:
+                    mask |= np.isin(self.ids[name], tiles)
+            self.__masks[key] = mask
+        return self.__masks[key]
+
+    def numbered(self, tiles: List[int], layers: List[str]) -> np.ndarray:
+        """Distinct numbers of the cells holding one of `tiles` in the numbered layers of `layers`."""
+        found = [self.numbers[name][np.isin(self.ids[name], tiles)] for name in layers if name in self.numbers]
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.uint8)
+
+    def number_mask(self, tiles: List[int], layers: List[str], numbers: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.shape, dtype=bool)
+        for name in layers:
+            if name in self.numbers:
+                mask |= np.isin(self.ids[name], tiles) & np.isin(self.numbers[name], numbers)
+        return mask
+
+
+def shift(mask: np.ndarray, dy: int, dx: int) -> np.ndarray:
+    """Return `mask` moved so that `result[y, x] == mask[y + dy, x + dx]`, out of bounds cells are False."""
+    h, w = mask.shape
+    result = np.zeros_like(mask)
+    if abs(dy) >= h or abs(dx) >= w:
+        return result
+    result[max(-dy, 0) : h - max(dy, 0), max(-dx, 0) : w - max(dx, 0)] = mask[
+        max(dy, 0) : h - max(-dy, 0), max(dx, 0) : w - max(-dx, 0)
+    ]
+    return result
+
+
+def label_regions(mask: np.ndarray, connectivity: int = 4) -> Tuple[np.ndarray, int]:
+    """Label connected regions of `mask` by vectorized union-find, returns labels (0 is background) and count."""
+    h, w = mask.shape
+    flat = mask.ravel()
+    index = np.arange(mask.size).reshape(h, w)
+
+    pairs = [
+        (index[:, :-1][mask[:, :-1] & mask[:, 1:]], 1),
+        (index[:-1, :][mask[:-1, :] & mask[1:, :]], w),
+    ]
+    if connectivity == 8:
+        pairs.append((index[:-1, :-1][mask[:-1, :-1] & mask[1:, 1:]], w + 1))
+        pairs.append((index[:-1, 1:][mask[:-1, 1:] & mask[1:, :-1]], w - 1))
+    a = np.concatenate([cells for cells, _ in pairs])
+    b = np.concatenate([cells + step for cells, step in pairs])
+
+    parent = np.arange(mask.size)
+    while a.size:
+        root_a, root_b = parent[a], parent[b]
+        differ = root_a != root_b
+        if not differ.any():
+            break
+        root_a, root_b = root_a[differ], root_b[differ]
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+        a, b = a[differ], b[differ]
+
+    cells = np.flatnonzero(flat)
+    roots, region = np.unique(parent[cells], return_inverse=True)
+    labels = np.zeros(mask.size, dtype=np.int32)
+    labels[cells] = region + 1
+    return labels.reshape(h, w), len(roots)
+
+
+def summarize_regions(labels: np.ndarray, count: int) -> List[Region]:
+    """Size and bounding box of every labeled region, largest first."""
+    if count == 0:
+        return []
+    ys, xs = np.nonzero(labels)
+    region = labels[ys, xs] - 1
+    size = np.bincount(region, minlength=count)
+    top = np.full(count, labels.shape[0])
+    left = np.full(count, labels.shape[1])
+    bottom = np.zeros(count, dtype=int)
+    right = np.zeros(count, dtype=int)
+    np.minimum.at(top, region, ys)
+    np.minimum.at(left, region, xs)
+    np.maximum.at(bottom, region, ys)
+    np.maximum.at(right, region, xs)
+    return [
+        Region(size=int(size[i]), top=int(top[i]), left=int(left[i]), bottom=int(bottom[i]), right=int(right[i]))
+        for i in np.argsort(-size, kind="stable")
+    ]
+
+
+def _report_regions(constraint: SpatialConstraint, regions: List[Region], message: str) -> List[RuleViolationError]:
+    violations = [
+        RuleViolationError(message=f"{message}: {region.describe()}", errors=[region.model_dump()])
+        for region in regions[: constraint.max_reported]
+    ]
+    if len(regions) > constraint.max_reported:
+        violations.append(
+            RuleViolationError(
+                message=f"{message}: {len(regions) - constraint.max_reported} more region(s) not shown",
+                errors=[len(regions), ">", constraint.max_reported],
+            )
+        )
+    return violations
+
+
+def _check_contiguous(constraint: SpatialConstraint, layers: TileLayers) -> List[RuleViolationError]:
+    labels, count = label_regions(layers.mask(constraint.tiles, constraint.layers), constraint.connectivity)
+    if count <= constraint.max_regions:
+        return []
+    return _report_regions(
+        constraint,
+        summarize_regions(labels, count),
+        f'"{constraint.humanized}" is split into {count} regions, at most {constraint.max_regions} allowed',
+    )
+
+
+def _check_not_adjacent(constraint: SpatialConstraint, layers: TileLayers) -> List[RuleViolationError]:
+    dy, dx = constraint.offset
+    neighbour = layers.mask(constraint.neighbour_tiles, constraint.layers)
+    violating = layers.mask(constraint.tiles, constraint.layers) & shift(neighbour, dy, dx)
+    labels, count = label_regions(violating, constraint.connectivity)
+    neighbour_name = constraint.neighbour_humanized or f"TileIDs {constraint.neighbour_tiles}"
+    return _report_regions(
+        constraint,
+        summarize_regions(labels, count),
+        f'"{constraint.humanized}" has "{neighbour_name}" at offset ({dy}, {dx})',
+    )
+
+
+def _check_paired(constraint: SpatialConstraint, layers: TileLayers) -> List[RuleViolationError]:
+    numbers = layers.numbered(constraint.tiles, constraint.layers)
+    partners = layers.numbered(constraint.partner_tiles, constraint.layers)
+    unmatched = np.setdiff1d(numbers, partners)
+    if unmatched.size == 0:
+        return []
+    labels, count = label_regions(
+        layers.number_mask(constraint.tiles, constraint.layers, unmatched), constraint.connectivity
+    )
+    return _report_regions(
+        constraint,
+        summarize_regions(labels, count),
+        f'"{constraint.humanized}" number(s) {", ".join(str(n) for n in unmatched)} have no matching partner',
+    )
+
+
+def _check_inside_border(constraint: SpatialConstraint, layers: TileLayers) -> List[RuleViolationError]:
+    border = np.ones(layers.shape, dtype=bool)
+    m = constraint.margin
+    border[m:-m, m:-m] = False
+    labels, count = label_regions(layers.mask(constraint.tiles, constraint.layers) & border, constraint.connectivity)
+    return _report_regions(
+        constraint,
+        summarize_regions(labels, count),
+        f'"{constraint.humanized}" lies within {m} tile(s) of the map border',
+    )
+
+
+CHECKS: Dict[str, Callable] = {
+    "contiguous": _check_contiguous,
+    "not_adjacent": _check_not_adjacent,
+    "paired": _check_paired,
+    "inside_border": _check_inside_border,
+}
+
+
+class ConstraintResult(BaseModel):
+    constraint: SpatialConstraint
+    violations: list
+
+    @property
+    def passed(self) -> bool:
+        return not self.violations
+
+
+class ValidParams(BaseModel):
+    constraints: List[SpatialConstraint]
+
+
+class Valid(BaseRule):
+    params: ValidParams
+
+    def get_params_model(self):
+        return ValidParams
+
+    @cached_property
+    def plan(self) -> List[Tuple[SpatialConstraint, Callable]]:
+        return [(constraint, CHECKS[constraint.type]) for constraint in self.params.constraints]
+
+    def results(self) -> List[ConstraintResult]:
+        layers = TileLayers(self.map_file)
+        return [
+            ConstraintResult(constraint=constraint, violations=check(constraint, layers))
+            for constraint, check in self.plan
+        ]
+
+    def evaluate(self):
+        return [violation for result in self.results() for violation in result.violations]
+
+    def explain(self):
+        return f"Check {len(self.params.constraints)} spatial tile constraints: " + ", ".join(
+            constraint.label() for constraint in self.params.constraints
+        )
@@ -0,0 +1,130 @@
+import pytest
+import twmap
+from pydantic import ValidationError
+
+from maps_workflow.rules.fields import Valid, parse_settings
+
+AIP_GORES = "tests/maps/Aip-Gores.map"
+
+
+def evaluate(settings, constraints):
+    map_file = twmap.Map(AIP_GORES)
+    map_file.info.settings = settings
+    return {
+        result.constraint.label(): result for result in Valid(None, map_file, {"constraints": constraints}).results()
+    }
+
+
+def test_parse_settings_unquotes_arguments():
+    settings = parse_settings(['sv_kog_map_quests "Q_NO_HAMMER,Q_TEAM_15"', "sv_team 1", "sv_team 0", 'sv_a "open'])
+
+    assert settings == {"sv_kog_map_quests": "Q_NO_HAMMER,Q_TEAM_15", "sv_team": "0", "sv_a": "open"}
+
+
+def test_parse_settings_keeps_backslashes_outside_quotes():
+    settings = parse_settings(["sv_a C:\\x\\y", 'sv_b "say \\"hi\\""'])
+
+    assert settings == {"sv_a": "C:\\x\\y", "sv_b": 'say "hi"'}
+
+
+def test_parse_settings_indexes_every_tune():
+    settings = parse_settings(["tune gravity 0.5", "tune ground_friction 0.3"])
+
+    assert settings["tune gravity"] == "0.5"
+    assert settings["tune ground_friction"] == "0.3"
+
+
+def test_list():
+    constraint = {
+        "field": "sv_kog_map_quests",
+        "type": "list",
+        "values": ["Q_NO_HAMMER", "Q_TEAM_15"],
+        "name": "quests",
+    }
+
+    assert evaluate(["sv_kog_map_quests Q_NO_HAMMER, Q_TEAM_15"], [constraint])["quests"].passed
+    assert evaluate(["sv_kog_map_quests Q_NO_HAMMER;Q_TEAM_15"], [{**constraint, "separator": ";"}])["quests"].passed
+
+    violation = evaluate(["sv_kog_map_quests Q_NO_HAMMER,Q_SOLO"], [constraint])["quests"].violation
+    assert '"Q_SOLO" in "sv_kog_map_quests" is not explicitly set' in str(violation)
+
+
+def test_regex():
+    constraint = {"source": "info", "field": "author", "type": "regex", "regex": "^[A-Z]\\w+$", "name": "author"}
+    map_file = twmap.Map(AIP_GORES)
+
+    map_file.info.author = "Aip"
+    assert Valid(None, map_file, {"constraints": [constraint]}).results()[0].passed
+
+    map_file.info.author = "aip"
+    assert "does not match" in str(Valid(None, map_file, {"constraints": [constraint]}).results()[0].violation)
+
+
+@pytest.mark.parametrize(
+    ("value", "passed"), [("0", True), ("1", True), ("0.5", True), ("-0.1", False), ("1.5", False)]
+)
+def test_range_bounds(value, passed):
+    results = evaluate(
+        [f"sv_team {value}"], [{"field": "sv_team", "type": "range", "min": 0, "max": 1, "name": "team"}]
+    )
+
+    assert results["team"].passed is passed
+
+
+def test_required_and_forbidden_when_present():
+    results = evaluate(
+        ["sv_team 1"],
+        [
+            {"field": "sv_team", "type": "required", "name": "required"},
+            {"field": "sv_team", "type": "forbidden", "name": "forbidden"},
+        ],
+    )
+
+    assert results["required"].passed
+    assert '"sv_team" is set to "1", but is not allowed' in str(results["forbidden"].violation)
+
+
+@pytest.mark.parametrize(
+    "constraint",
+    [
+        {"field": "sv_a", "type": "regex"},
+        {"field": "sv_a", "type": "range"},
+        {"field": "sv_a", "type": "list"},
+        {"field": "sv_a", "type": "lst"},
+        {"field": "sv_a", "type": "required", "source": "infos"},
+    ],
+)
+def test_invalid_constraint_fails_validation(constraint):
+    with pytest.raises(ValidationError):
+        Valid(None, None, {"constraints": [constraint]})
+
+
+def test_list_accepts_quoted_setting():
+    results = evaluate(
+        ['sv_kog_map_quests "Q_NO_HAMMER,Q_TEAM_15"'],
+        [{"field": "sv_kog_map_quests", "type": "list", "values": ["Q_NO_HAMMER", "Q_TEAM_15"], "name": "quests"}],
+    )
+
+    assert results["quests"].passed
+
+
+def test_range_rejects_non_finite_numbers():
+    for value in ("nan", "inf", "1e400", "abc"):
+        results = evaluate(
+            [f"sv_team {value}"], [{"field": "sv_team", "type": "range", "min": 0, "max": 1, "name": "team"}]
+        )
+
+        assert "is not a number" in str(results["team"].violation)
+
+
+def test_empty_info_fields_are_unset():
+    results = evaluate(
+        [],
+        [
+            {"source": "info", "field": "author", "type": "required", "name": "author"},
+            {"source": "info", "field": "credits", "type": "forbidden", "name": "credits"},
+        ],
+    )
+
+    assert not results["author"].passed
+    assert results["credits"].passed
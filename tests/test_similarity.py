@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+import twmap
+
+from maps_workflow.rules.similarity import INDEX_PATH_ENV, MapIndex, Unique
+from maps_workflow.rules.spatial import shift
+
+AIP_GORES = "tests/maps/Aip-Gores.map"
+TINY_MAP = "tests/maps/tiny_finishable_map.map"
+
+
+def with_game_tiles(ids):
+    map_file = twmap.Map(AIP_GORES)
+    tiles = np.zeros((*ids.shape, 2), dtype=np.uint8)
+    tiles[:, :, 0] = ids
+    map_file.game_layer().tiles = tiles
+    return map_file
+
+
+def cave(rng, height, width):
+    """Cellular automaton caves, unrelated maps of this kind still share many common blocks."""
+    solid = rng.random((height, width)) < 0.45
+    for _ in range(4):
+        neighbours = sum(shift(solid, dy, dx).astype(int) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx)
+        solid = neighbours >= 5
+    return solid.astype(np.uint8)
+
+
+@pytest.fixture
+def aip_ids():
+    return twmap.Map(AIP_GORES).game_layer().tiles[:, :, 0].copy()
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    index = MapIndex()
+    assert index.add("Aip-Gores", twmap.Map(AIP_GORES))
+    assert not index.add("tiny_finishable_map", twmap.Map(TINY_MAP))
+    path = tmp_path / "map_index.npz"
+    index.save(str(path))
+    return str(path)
+
+
+def query(path, map_file, exclude=None):
+    index = MapIndex.load(path)
+    return index.query(*index.fingerprint(map_file), threshold=0.3, limit=5, exclude=exclude)
+
+
+def test_index_round_trip_excludes_self(index_path):
+    index = MapIndex.load(index_path)
+
+    assert index.names == ["Aip-Gores"]
+    assert [match.name for match in query(index_path, twmap.Map(AIP_GORES))] == ["Aip-Gores"]
+    assert query(index_path, twmap.Map(AIP_GORES), exclude="Aip-Gores") == []
+
+
+def test_shifted_copy_is_found(index_path, aip_ids):
+    matches = query(index_path, with_game_tiles(np.roll(aip_ids, 5, axis=1)))
+
+    assert [match.name for match in matches] == ["Aip-Gores"]
+    assert matches[0].overlap > 0.9
+
+
+def test_embedded_copy_is_found_despite_low_similarity(index_path, aip_ids):
+    rng = np.random.default_rng(0)
+    ids = np.zeros((aip_ids.shape[0], aip_ids.shape[1] * 3), dtype=np.uint8)
+    ids[:, : aip_ids.shape[1]] = aip_ids
+    ids[:, aip_ids.shape[1] :] = rng.random((aip_ids.shape[0], aip_ids.shape[1] * 2)) < 0.5
+
+    matches = query(index_path, with_game_tiles(ids))
+
+    assert [match.name for match in matches] == ["Aip-Gores"]
+    assert matches[0].similarity < 0.3 < matches[0].overlap
+
+
+def test_unrelated_map_is_not_reported(index_path):
+    rng = np.random.default_rng(0)
+
+    assert query(index_path, with_game_tiles((rng.random((150, 300)) < 0.5).astype(np.uint8))) == []
+
+
+def test_small_unrelated_map_is_not_reported_against_large_map(tmp_path):
+    rng = np.random.default_rng(0)
+    index = MapIndex()
+    for name in ("cave-1", "cave-2"):
+        assert index.add(name, with_game_tiles(cave(rng, 400, 800)))
+    path = tmp_path / "map_index.npz"
+    index.save(str(path))
+
+    for _ in range(20):
+        assert query(str(path), with_game_tiles(cave(rng, 40, 80))) == []
+
+
+def test_unique_reads_index_path_param(index_path, monkeypatch):
+    monkeypatch.setenv(INDEX_PATH_ENV, index_path + ".missing")
+
+    params = {"index_path": index_path, "threshold": 0.3}
+    assert len(Unique("maps/Copy.map", twmap.Map(AIP_GORES), params).evaluate()) == 1
+
+
+def test_unique_reads_index_from_environment(index_path, monkeypatch):
+    monkeypatch.setenv(INDEX_PATH_ENV, index_path)
+
+    assert len(Unique("maps/Copy.map", twmap.Map(AIP_GORES), {"threshold": 0.3}).evaluate()) == 1
+    assert Unique("maps/Aip-Gores.map", twmap.Map(AIP_GORES), {"threshold": 0.3}).evaluate() == []
+
+    monkeypatch.setenv(INDEX_PATH_ENV, index_path + ".missing")
+    assert "not found" in str(Unique("maps/Copy.map", twmap.Map(AIP_GORES), {"threshold": 0.3}).evaluate()[0])
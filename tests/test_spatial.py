@@ -0,0 +1,128 @@
+from collections import deque
+
+import numpy as np
+import pytest
+import twmap
+from pydantic import ValidationError
+
+from maps_workflow.rules.spatial import Valid, label_regions, shift
+
+TINY_MAP = "tests/maps/tiny_finishable_map.map"
+
+NEIGHBOURS = {
+    4: [(0, 1), (1, 0), (0, -1), (-1, 0)],
+    8: [(0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)],
+}
+
+
+def bfs_regions(mask, connectivity):
+    labels = np.zeros(mask.shape, dtype=int)
+    count = 0
+    for y, x in zip(*np.nonzero(mask)):
+        if labels[y, x]:
+            continue
+        count += 1
+        labels[y, x] = count
+        queue = deque([(y, x)])
+        while queue:
+            cy, cx = queue.popleft()
+            for dy, dx in NEIGHBOURS[connectivity]:
+                ny, nx = cy + dy, cx + dx
+                if 0 <= ny < mask.shape[0] and 0 <= nx < mask.shape[1] and mask[ny, nx] and not labels[ny, nx]:
+                    labels[ny, nx] = count
+                    queue.append((ny, nx))
+    return labels, count
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+def test_label_regions_matches_bfs(connectivity):
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        mask = rng.random((rng.integers(1, 30), rng.integers(1, 30))) < rng.random()
+
+        labels, count = label_regions(mask, connectivity)
+        expected_labels, expected_count = bfs_regions(mask, connectivity)
+
+        assert count == expected_count
+        assert ((labels > 0) == mask).all()
+        # same partition: every region maps onto exactly one reference region
+        assert len(set(zip(labels[mask], expected_labels[mask]))) == count
+
+
+def test_shift_bounds():
+    mask = np.arange(12).reshape(3, 4) % 3 == 0
+
+    assert (shift(mask, 1, 0)[:-1] == mask[1:]).all() and not shift(mask, 1, 0)[-1].any()
+    assert (shift(mask, 0, -1)[:, 1:] == mask[:, :-1]).all() and not shift(mask, 0, -1)[:, 0].any()
+    assert (shift(mask, -2, 3)[2:, :1] == mask[:1, 3:]).all() and shift(mask, -2, 3).sum() == mask[:1, 3:].sum()
+    assert not shift(mask, 3, 0).any() and not shift(mask, 0, -4).any()
+
+
+def map_with_tele(tiles):
+    map_file = twmap.Map(TINY_MAP)
+    layer = map_file.physics_group().layers.new_physics("Tele")
+    tele = np.zeros(layer.tiles.shape, dtype=np.uint8)
+    for (y, x), (number, tile_id) in tiles.items():
+        tele[y, x] = (number, tile_id)
+    layer.tiles = tele
+    return map_file
+
+
+def evaluate(map_file, constraint):
+    return Valid(None, map_file, {"constraints": [constraint]}).evaluate()
+
+
+def test_paired_reports_missing_tele_out():
+    map_file = map_with_tele({(0, 0): (1, 26), (0, 1): (1, 26), (3, 6): (1, 27), (2, 2): (2, 26)})
+    constraint = {"type": "paired", "humanized": "Tele-in", "tiles": [26], "partner_tiles": [27], "layers": ["tele"]}
+
+    violations = evaluate(map_file, constraint)
+
+    assert len(violations) == 1
+    assert "number(s) 2 have no matching partner" in str(violations[0])
+    assert "from position (2, 2) to (2, 2)" in str(violations[0])
+
+
+def test_not_adjacent_reports_offset_as_row_column():
+    map_file = twmap.Map(TINY_MAP)
+    constraint = {
+        "type": "not_adjacent",
+        "humanized": "Start",
+        "tiles": [33],
+        "neighbour_tiles": [1],
+        "neighbour_humanized": "Hookable",
+        "offset": [1, 0],
+    }
+
+    violations = evaluate(map_file, constraint)
+
+    assert len(violations) == 1
+    assert 'has "Hookable" at offset (1, 0): 1 tile(s) from position (3, 3) to (3, 3)' in str(violations[0])
+
+
+@pytest.mark.parametrize(
+    "field",
+    [
+        {"connectivity": 6},
+        {"type": "contigous"},
+        {"type": "not_adjacent"},
+        {"type": "paired", "layers": ["tele"]},
+        {"type": "paired", "partner_tiles": [27]},
+        {"type": "paired", "partner_tiles": [27], "layers": ["game", "front"]},
+    ],
+)
+def test_invalid_constraint_fails_validation(field):
+    with pytest.raises(ValidationError):
+        Valid(None, None, {"constraints": [{"type": "contiguous", "humanized": "Start", "tiles": [33], **field}]})
+
+
+def test_paired_accepts_numbered_layer_among_others():
+    constraint = {
+        "type": "paired",
+        "humanized": "Tele-in",
+        "tiles": [26],
+        "partner_tiles": [27],
+        "layers": ["game", "tele"],
+    }
+
+    assert Valid(None, None, {"constraints": [constraint]}).params.constraints[0].layers == ["game", "tele"]